@@ -1,31 +1,241 @@
-from http.server import HTTPServer, BaseHTTPRequestHandler
-import inspect
-import json
+from collections import defaultdict, deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import os
+import re
+import socket
+import sys
+import threading
+import time
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the stdlib encoder
+    orjson = None
 
 from models.base import Model
 from models.fields import CharField, IntegerField, DateTimeField
+from models.exceptions import ObjectDoesNotExist
 from core.request import Request
 from core.response import Response
 from core.router import Router
 from controllers.model_controller import ModelController
 
 
+# ==========================================
+# Serialization
+# ==========================================
+
+if orjson is not None:
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+else:
+    import json
+    from datetime import date
+
+    def _json_default(obj):
+        # Dates and datetimes as ISO 8601 strings, as orjson emits them
+        if isinstance(obj, date):
+            return obj.isoformat()
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    def _dumps(data):
+        # Same output as orjson: compact separators, UTF-8 left unescaped
+        return json.dumps(
+            data, default=_json_default, separators=(',', ':'), ensure_ascii=False
+        ).encode('utf-8')
+    _loads = json.loads
+
+def _encoded_response(body, status):
+    resp = Response(body=body, status=status)
+    resp.headers['Content-Type'] = 'application/json'
+    return resp
+
+def json_response(data, status=200):
+    """Like Response.json, but the body is already UTF-8 bytes."""
+    return _encoded_response(_dumps(data), status)
+
+_SENTINEL = object()
+
+class FrameworkRequest(Request):
+    """
+    Request whose JSON body is parsed at most once. The server passes
+    the body through as raw bytes; both orjson and json accept them.
+    Every json() call returns the same object, so callers must treat it
+    as read-only and copy it before changing it.
+    """
+    def json(self):
+        cached = getattr(self, '_json_cache', _SENTINEL)
+        if cached is _SENTINEL:
+            try:
+                cached = _loads(self.body)
+            except (TypeError, ValueError):
+                cached = {}
+            self._json_cache = cached
+        return cached
+
+# Error envelopes are encoded once at import time and reused per request
+_NOT_FOUND_BODY = _dumps({"error": "Not Found"})
+# The prefix is cut from the encoder's own output so the separators
+# match whichever encoder is in use
+_SERVER_ERROR_PREFIX = _dumps(
+    {"error": "Internal Server Error", "details": None}
+)[:-len(b'null}')]
+
+def json_list_response(objects):
+    """JSON array response built from each object's cached encoding."""
+    return _encoded_response(
+        b'[' + b','.join(obj.to_json_bytes() for obj in objects) + b']', 200
+    )
+
+def not_found_response():
+    return _encoded_response(_NOT_FOUND_BODY, 404)
+
+def server_error_response(details):
+    return _encoded_response(_SERVER_ERROR_PREFIX + _dumps(details) + b'}', 500)
+
+
 # ==========================================
 # Models
 # ==========================================
 
-class User(Model):
+# One lock for every model: Model keeps its storage and id allocation
+# on the base class (Model._clear_storage() resets all models at once),
+# so per-class locks would still let User and Post race on it
+_MODEL_LOCK = threading.RLock()
+
+class LockedModelMixin:
+    """
+    Serializes writes to model storage on the shared _MODEL_LOCK. The
+    threaded server runs handlers concurrently, and Model's storage and
+    id allocation are not safe to mutate from several threads at once.
+    The lock is reentrant because create() goes through save().
+    """
+    _lock = _MODEL_LOCK
+
+    @classmethod
+    def create(cls, **kwargs):
+        with cls._lock:
+            return super().create(**kwargs)
+
+    def save(self):
+        with self._lock:
+            return super().save()
+
+    def delete(self):
+        with self._lock:
+            return super().delete()
+
+class CachedJSONMixin(LockedModelMixin):
+    """
+    Caches the encoded to_dict() of an instance until its next save or
+    delete, so read-heavy listings don't re-serialize unchanged rows.
+    Attribute changes are only picked up once the instance is saved.
+
+    The cache is filled and cleared under the model lock, so a reader
+    can't store bytes encoded before a concurrent save cleared them.
+    """
+    _cached_json = None
+
+    def save(self):
+        with self._lock:
+            super().save()
+            self._cached_json = None
+
+    def delete(self):
+        with self._lock:
+            self._cached_json = None
+            return super().delete()
+
+    def to_json_bytes(self):
+        cached = self._cached_json
+        if cached is None:
+            with self._lock:
+                cached = self._cached_json
+                if cached is None:
+                    cached = self._cached_json = _dumps(self.to_dict())
+        return cached
+
+class IndexedModelMixin(LockedModelMixin):
+    """
+    Keeps in-memory secondary indexes (value -> set of ids) for the
+    fields listed in `indexed_fields`, so equality lookups don't have
+    to scan every row. When a SQL backend is added, the same lookups
+    should become a WHERE on an indexed column (and select_related
+    for the eager-loading case) instead.
+
+    Index updates and reads share the model's LockedModelMixin lock.
+    """
+    indexed_fields = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._indexes = {name: defaultdict(set) for name in cls.indexed_fields}
+
+    def save(self):
+        with self._lock:
+            super().save()
+            self._unindex()
+            indexed = {}
+            for name, index in self._indexes.items():
+                value = getattr(self, name, None)
+                index[value].add(self.id)
+                indexed[name] = value
+            self._indexed_values = indexed
+
+    def delete(self):
+        with self._lock:
+            self._unindex()
+            return super().delete()
+
+    def _unindex(self):
+        for name, value in getattr(self, '_indexed_values', {}).items():
+            ids = self._indexes[name].get(value)
+            if ids is not None:
+                ids.discard(self.id)
+                if not ids:
+                    del self._indexes[name][value]
+        self._indexed_values = {}
+
+    @classmethod
+    def filter(cls, **kwargs):
+        """Rows whose fields equal kwargs; uses the indexes when it can."""
+        if not kwargs or any(k not in cls._indexes for k in kwargs):
+            return [obj for obj in cls.all()
+                    if all(getattr(obj, k, None) == v for k, v in kwargs.items())]
+
+        ids = None
+        with cls._lock:
+            for k, v in kwargs.items():
+                matched = cls._indexes[k].get(v, ())
+                ids = set(matched) if ids is None else ids & matched
+                if not ids:
+                    return []
+
+        results = []
+        for pk in sorted(ids):
+            try:
+                obj = cls.get(pk)
+            except ObjectDoesNotExist:
+                # Storage was cleared behind the index's back
+                continue
+            if all(getattr(obj, k, None) == v for k, v in kwargs.items()):
+                results.append(obj)
+        return results
+
+class User(CachedJSONMixin, Model):
     name = CharField(max_length=100, required=True)
     email = CharField(max_length=200, required=True)
     created_at = DateTimeField(auto_now=True)
 
-class Post(Model):
+class Post(CachedJSONMixin, Model):
     title = CharField(max_length=200, required=True)
     content = CharField(max_length=5000)
     author_id = IntegerField(required=True)
     created_at = DateTimeField(auto_now=True)
 
-class Comment(Model):
+class Comment(IndexedModelMixin, CachedJSONMixin, Model):
+    indexed_fields = ('post_id',)
+
     post_id = IntegerField(required=True)
     content = CharField(max_length=500, required=True)
     author_id = IntegerField(required=True)
@@ -35,19 +245,24 @@ class Comment(Model):
 # Controllers
 # ==========================================
 
-class UserController(ModelController):
+class JSONModelController(ModelController):
+    def list(self):
+        return json_list_response(self.model.all())
+
+class UserController(JSONModelController):
     model = User
 
-class PostController(ModelController):
+class PostController(JSONModelController):
     model = Post
 
-class CommentController(ModelController):
+class CommentController(JSONModelController):
     model = Comment
 
     def create_for_post(self, id):
         # 'id' here is the post_id from the URL /posts/<id>/comments
         # We need to inject it into the body or just set it
-        data = self.request.json()
+        # json() is cached per request, so copy before injecting post_id
+        data = dict(self.request.json())
         data['post_id'] = int(id)
         
         # Simple validation that author_id exists is absent for brevity, 
@@ -55,43 +270,211 @@ class CommentController(ModelController):
         
         try:
             instance = self.model.create(**data)
-            return Response.created(instance.to_dict())
+            return json_response(instance.to_dict(), status=201)
         except Exception as e:
             return Response.bad_request(str(e))
 
     def list_for_post(self, id):
-        # List comments for post <id>
-        # Naive implementation: get all and filter
-        all_comments = self.model.all()
-        # Filter
-        post_comments = [c for c in all_comments if c.post_id == int(id)]
-        return Response.json([c.to_dict() for c in post_comments])
+        # List comments for post <id> via the post_id index
+        post_comments = self.model.filter(post_id=int(id))
+        return json_list_response(post_comments)
 
 
 # ==========================================
 # App Setup & Routing
 # ==========================================
 
-router = Router()
+_PARAM_RE = re.compile(r'<(\w+)>')
+
+class DispatchRouter(Router):
+    """
+    Router with a tiered dispatcher in front of the route list:
+    fully static paths are a single dict lookup; routes whose params
+    each fill a whole segment (/posts/<id>/comments) are matched by
+    splitting the path on '/'; anything else for a method is tried with
+    one combined regex instead of one regex per route. The base Router
+    still records every route.
+
+    Every route keeps its registration index, and when several tiers
+    match, the earliest-registered route wins, as in the base Router.
+    A static route shadowed by an earlier dynamic one is never put in
+    the static dict.
+    """
+    def __init__(self):
+        super().__init__()
+        self._order = 0
+        self._static = {}
+        self._segments = defaultdict(list)
+        self._dynamic = defaultdict(list)
+        self._combined = {}
+        self._dirty = set()
+
+    def get(self, path, handler):
+        super().get(path, handler)
+        self._register('GET', path, handler)
+
+    def post(self, path, handler):
+        super().post(path, handler)
+        self._register('POST', path, handler)
+
+    def put(self, path, handler):
+        super().put(path, handler)
+        self._register('PUT', path, handler)
+
+    def delete(self, path, handler):
+        super().delete(path, handler)
+        self._register('DELETE', path, handler)
+
+    def _register(self, method, path, handler):
+        index = self._order
+        self._order += 1
+
+        if _PARAM_RE.search(path) is None:
+            if self._match_dynamic(method, path) is None:
+                self._static.setdefault((method, path), handler)
+            return
+
+        parts = path.split('/')
+        literals = []
+        params = []
+        for i, part in enumerate(parts):
+            m = _PARAM_RE.fullmatch(part)
+            if m is not None:
+                params.append((i, m.group(1)))
+            elif '<' in part or '>' in part:
+                # Param embedded in a segment; needs the regex tier
+                self._dynamic[method].append((index, path, handler))
+                self._dirty.add(method)
+                return
+            else:
+                literals.append((i, part))
+        self._segments[(method, len(parts))].append(
+            (index, tuple(literals), tuple(params), handler)
+        )
+
+    def _compile(self, method):
+        parts = []
+        routes = []
+        for i, (index, path, handler) in enumerate(self._dynamic[method]):
+            params = []
+            pattern = ''
+            pos = 0
+            for m in _PARAM_RE.finditer(path):
+                group = f'r{i}_{m.group(1)}'
+                params.append((group, m.group(1)))
+                pattern += re.escape(path[pos:m.start()]) + f'(?P<{group}>[^/]+)'
+                pos = m.end()
+            pattern += re.escape(path[pos:])
+            parts.append(f'(?P<r{i}>{pattern})')
+            routes.append((index, handler, params))
+        self._combined[method] = (re.compile('(?:' + '|'.join(parts) + ')'), routes)
+        self._dirty.discard(method)
+
+    def _match_dynamic(self, method, path):
+        """(index, handler, path_params) of the earliest dynamic match."""
+        found = None
+        parts = path.split('/')
+        for index, literals, params, handler in self._segments.get((method, len(parts)), ()):
+            for i, literal in literals:
+                if parts[i] != literal:
+                    break
+            else:
+                values = {name: parts[i] for i, name in params}
+                if all(values.values()):
+                    found = (index, handler, values)
+                    break
+
+        if method in self._dirty:
+            self._compile(method)
+        combined = self._combined.get(method)
+        if combined is None:
+            return found
+        regex, routes = combined
+        # Alternatives are in registration order, so if the segment
+        # match predates every regex route the regex can't win
+        if found is not None and found[0] < routes[0][0]:
+            return found
+        m = regex.fullmatch(path)
+        if m is None:
+            return found
+
+        # The outer route group closes last, so it is the lastindex
+        index, handler, params = routes[int(m.lastgroup[1:])]
+        if found is not None and found[0] < index:
+            return found
+        return index, handler, {name: m.group(group) for group, name in params}
+
+    def match(self, request):
+        method = request.method
+        path = request.path.split('?', 1)[0]
+
+        handler = self._static.get((method, path))
+        if handler is not None:
+            return handler
+
+        found = self._match_dynamic(method, path)
+        if found is None:
+            return None
+        _, handler, request.path_params = found
+        return handler
+
+router = DispatchRouter()
+
+_CO_VARARGS = 0x04
+_CO_VARKEYWORDS = 0x08
+
+def _params(func):
+    """
+    Parameter names of an unbound method, minus self, and whether they
+    can all be passed positionally. Decorated methods are unwrapped via
+    __wrapped__, as inspect.signature does.
+    """
+    while hasattr(func, '__wrapped__'):
+        func = func.__wrapped__
+    code = getattr(func, '__code__', None)
+    if (code is not None and not code.co_kwonlyargcount
+            and not code.co_flags & (_CO_VARARGS | _CO_VARKEYWORDS)):
+        return code.co_varnames[1:code.co_argcount], True
+
+    # Builtins, *args/**kwargs and keyword-only parameters; inspect is
+    # heavy to import, so only pay for it here
+    import inspect
+    named = (inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY)
+    names = tuple(
+        name for name, p in inspect.signature(func).parameters.items()
+        if name != 'self' and p.kind in named
+    )
+    return names, False
 
 def register_controller(controller_cls, method_name):
     """
     Adapter to bind a controller method to the router handler signature.
     Matches request, instantiates controller, calls method with params.
     """
-    def handler(request):
-        # Dependency Injection / Factory could go here
-        controller = controller_cls(request)
-        func = getattr(controller, method_name)
-        
-        # Inspect signature to pass path parameters
-        sig = inspect.signature(func)
-        kwargs = {}
-        for param in sig.parameters:
-            if param in request.path_params:
-                kwargs[param] = request.path_params[param]
-                
-        return func(**kwargs)
+    func = getattr(controller_cls, method_name)
+
+    # Resolve the path parameters once, at registration time, and
+    # specialize the common zero- and one-parameter shapes
+    param_names, positional = _params(func)
+
+    if not param_names:
+        def handler(request):
+            return func(controller_cls(request))
+    elif len(param_names) == 1 and positional:
+        name = param_names[0]
+
+        def handler(request):
+            path_params = request.path_params
+            if name in path_params:
+                return func(controller_cls(request), path_params[name])
+            return func(controller_cls(request))
+    else:
+        def handler(request):
+            # Dependency Injection / Factory could go here
+            controller = controller_cls(request)
+            path_params = request.path_params
+            kwargs = {p: path_params[p] for p in param_names if p in path_params}
+            return func(controller, **kwargs)
     return handler
 
 # User Routes
@@ -109,11 +492,71 @@ router.post('/posts/<id>/comments', register_controller(CommentController, 'crea
 router.get('/posts/<id>/comments', register_controller(CommentController, 'list_for_post'))
 
 
+# ==========================================
+# Profiling
+# ==========================================
+
+# The request hot path is match -> handler -> encode -> socket write.
+# It is memory-bound on payload size and syscall-bound on small
+# responses, not compute-bound, so CPU-heavy work added to it shows up
+# directly in latency. Run with FRAMEWORK_PROFILE=1 to time each stage
+# and read the percentiles from /__perf__:
+#   parse   request line, headers, body read and Request construction
+#   handle  route match and controller, including encoding the body
+#   write   status line and headers, access log and the socket write
+# Requests to /__perf__ itself are not sampled.
+PROFILE = os.environ.get('FRAMEWORK_PROFILE') == '1'
+
+_PERF_STAGES = ('parse', 'handle', 'write')
+_PERF_SAMPLES = 1024
+# Bounded ring buffers of nanosecond timings; deque.append is atomic
+_perf = {stage: deque(maxlen=_PERF_SAMPLES) for stage in _PERF_STAGES}
+
+def _percentiles(samples):
+    ordered = sorted(samples)
+    if not ordered:
+        return {"count": 0}
+    last = len(ordered) - 1
+
+    def pick(q):
+        return ordered[min(last, int(len(ordered) * q))] / 1000
+
+    return {
+        "count": len(ordered),
+        "p50_us": pick(0.50),
+        "p90_us": pick(0.90),
+        "p99_us": pick(0.99),
+        "max_us": ordered[-1] / 1000,
+    }
+
+def perf_stats(request):
+    return json_response({stage: _percentiles(list(_perf[stage])) for stage in _PERF_STAGES})
+
+if PROFILE:
+    router.get('/__perf__', perf_stats)
+
+
 # ==========================================
 # Server Adapter
 # ==========================================
 
+# Methods whose requests carry no body worth reading
+_NO_BODY = frozenset(('GET', 'DELETE', 'HEAD'))
+
 class FrameworkHTTPHandler(BaseHTTPRequestHandler):
+    def setup(self):
+        super().setup()
+        # Responses are small; don't let Nagle hold them back. Only TCP
+        # sockets have the option (AF_UNIX socketpairs don't)
+        if self.connection.family in (socket.AF_INET, socket.AF_INET6):
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def parse_request(self):
+        # Start the clock before the request line and headers are parsed
+        if PROFILE:
+            self._t_start = time.perf_counter_ns()
+        return super().parse_request()
+
     def do_GET(self):
         self._handle()
         
@@ -127,18 +570,25 @@ class FrameworkHTTPHandler(BaseHTTPRequestHandler):
         self._handle()
 
     def _handle(self):
-        # Read Body
-        content_length = int(self.headers.get('Content-Length', 0))
-        body = self.rfile.read(content_length).decode('utf-8')
+        # Read Body as raw bytes; FrameworkRequest.json() parses bytes
+        # directly, so there is no decode pass. Read-only methods skip
+        # the read entirely.
+        if self.command in _NO_BODY:
+            body = b''
+        else:
+            content_length = int(self.headers.get('Content-Length', 0))
+            body = self.rfile.read(content_length)
         
         # Create Request
-        req = Request(
+        req = FrameworkRequest(
             method=self.command,
             path=self.path,
             body=body,
             headers=self.headers
         )
-        
+        if PROFILE:
+            t_parsed = time.perf_counter_ns()
+
         # Match Route
         handler = router.match(req)
         
@@ -146,25 +596,46 @@ class FrameworkHTTPHandler(BaseHTTPRequestHandler):
             try:
                 resp = handler(req)
             except Exception as e:
-                resp = Response.json({"error": "Internal Server Error", "details": str(e)}, status=500)
+                resp = server_error_response(str(e))
         else:
-            resp = Response.not_found()
-            
-        # Send Response
-        self.send_response(resp.status)
-        for k, v in resp.headers.items():
-            self.send_header(k, v)
-        self.end_headers()
-        self.wfile.write(resp.body.encode('utf-8'))
+            resp = not_found_response()
+        if PROFILE:
+            t_handled = time.perf_counter_ns()
+
+        # Send Response: status line, headers and body go out in one
+        # write instead of send_response/send_header's buffered pieces
+        body = resp.body if isinstance(resp.body, bytes) else resp.body.encode('utf-8')
+        self.log_request(resp.status)
+        reason = self.responses.get(resp.status, ('',))[0]
+        head = [
+            f"{self.protocol_version} {resp.status} {reason}\r\n"
+            f"Server: {self.version_string()}\r\n"
+            f"Date: {self.date_time_string()}\r\n"
+        ]
+        head.extend(f"{k}: {v}\r\n" for k, v in resp.headers.items())
+        head.append(f"Content-Length: {len(body)}\r\n\r\n")
+        self.wfile.write(''.join(head).encode('latin-1', 'strict') + body)
+
+        if PROFILE and handler is not perf_stats:
+            _perf['parse'].append(t_parsed - self._t_start)
+            _perf['handle'].append(t_handled - t_parsed)
+            _perf['write'].append(time.perf_counter_ns() - t_handled)
+
+class FrameworkServer(ThreadingHTTPServer):
+    # One thread per request; don't block shutdown on in-flight handlers
+    daemon_threads = True
+    allow_reuse_address = True
 
 def run_server():
     server_address = ('', 8000)
-    print("Starting mini_framework blog app on port 8000...")
-    print("Available Routes:")
-    for r in router.routes:
-        print(f"  {r['method']} {r['regex'].pattern}")
-        
-    httpd = HTTPServer(server_address, FrameworkHTTPHandler)
+    sys.stdout.write(
+        "Starting mini_framework blog app on port 8000...\n"
+        "Available Routes:\n"
+        + "".join(f"  {r['method']} {r['regex'].pattern}\n" for r in router.routes)
+    )
+    sys.stdout.flush()
+
+    httpd = FrameworkServer(server_address, FrameworkHTTPHandler)
     try:
         httpd.serve_forever()
     except KeyboardInterrupt:
@@ -1,4 +1,9 @@
+from datetime import datetime
+import functools
+import socket
+import threading
 import unittest
+from unittest import mock
 import json
 from core.router import Router
 from .core.request import Request
@@ -8,6 +13,13 @@ from.models.fields import CharField, IntegerField
 from .models.exceptions import ValidationError, ObjectDoesNotExist
 from .controllers.model_controller import ModelController
 from .controllers.base import Controller
+from app import (
+    Comment, CommentController, DispatchRouter,
+    FrameworkHTTPHandler, FrameworkRequest, json_list_response,
+    json_response, not_found_response, _params, _percentiles, _perf,
+    _PERF_STAGES, perf_stats, Post, PostController,
+    register_controller, server_error_response, User,
+)
 
 # --- 1. Request/Response Tests ---
 
@@ -221,6 +233,407 @@ class TestIntegration(unittest.TestCase):
         data = json.loads(res_list.body)
         self.assertEqual(data[0]['name'], "Integrated")
 
+# --- 5. App Tests ---
+
+class TestIndexedModel(unittest.TestCase):
+    def setUp(self):
+        Comment._clear_storage()
+
+    def create(self, post_id):
+        return Comment.create(post_id=post_id, content="hi", author_id=1)
+
+    def test_filter_after_save(self):
+        first = self.create(1)
+        self.create(2)
+        second = self.create(1)
+        self.assertEqual([c.id for c in Comment.filter(post_id=1)], [first.id, second.id])
+        self.assertEqual(Comment.filter(post_id=3), [])
+
+    def test_resave_moves_row(self):
+        comment = self.create(1)
+        comment.post_id = 2
+        comment.save()
+        self.assertEqual(Comment.filter(post_id=1), [])
+        self.assertEqual([c.id for c in Comment.filter(post_id=2)], [comment.id])
+
+    def test_delete_removes_row(self):
+        comment = self.create(1)
+        comment.delete()
+        self.assertEqual(Comment.filter(post_id=1), [])
+
+    def test_cleared_storage_skips_stale_ids(self):
+        self.create(1)
+        Comment._clear_storage()
+        self.assertEqual(Comment.filter(post_id=1), [])
+
+    def test_unindexed_field_falls_back_to_scan(self):
+        comment = self.create(1)
+        self.create(2)
+        self.assertEqual([c.id for c in Comment.filter(content="hi", post_id=1)], [comment.id])
+
+class TestDispatchRouter(unittest.TestCase):
+    def setUp(self):
+        self.router = DispatchRouter()
+
+    def dispatch(self, path, method='GET'):
+        req = Request(method=method, path=path)
+        handler = self.router.match(req)
+        return (handler(req) if handler else None), req.path_params
+
+    def test_static_match(self):
+        self.router.get('/users', lambda r: "list")
+        self.assertEqual(self.dispatch('/users')[0], "list")
+        self.assertIsNone(self.dispatch('/users', method='POST')[0])
+
+    def test_param_match(self):
+        self.router.get('/posts/<id>/comments', lambda r: "comments")
+        result, params = self.dispatch('/posts/7/comments')
+        self.assertEqual(result, "comments")
+        self.assertEqual(params, {'id': '7'})
+        self.assertIsNone(self.dispatch('/posts/7')[0])
+        self.assertIsNone(self.dispatch('/posts/7/comments/extra')[0])
+
+    def test_param_inside_segment(self):
+        self.router.get('/files/<name>.txt', lambda r: "file")
+        result, params = self.dispatch('/files/notes.txt')
+        self.assertEqual(result, "file")
+        self.assertEqual(params, {'name': 'notes'})
+        self.assertIsNone(self.dispatch('/files/a/b.txt')[0])
+
+    def test_query_string_is_stripped(self):
+        self.router.get('/users', lambda r: "list")
+        self.router.get('/users/<id>', lambda r: "user")
+        self.assertEqual(self.dispatch('/users?page=2')[0], "list")
+        result, params = self.dispatch('/users/5?x=1')
+        self.assertEqual(result, "user")
+        self.assertEqual(params, {'id': '5'})
+
+    def test_empty_segment_rejected(self):
+        self.router.get('/users/<id>', lambda r: "user")
+        self.router.get('/posts/<id>/comments', lambda r: "comments")
+        self.assertIsNone(self.dispatch('/users/')[0])
+        self.assertIsNone(self.dispatch('/posts//comments')[0])
+
+class TestJSONResponse(unittest.TestCase):
+    def test_body_is_encoded_json(self):
+        res = json_response({'a': [1, 2]}, status=201)
+        self.assertEqual(res.status, 201)
+        self.assertIsInstance(res.body, bytes)
+        self.assertEqual(json.loads(res.body), {'a': [1, 2]})
+        self.assertEqual(res.headers['Content-Type'], 'application/json')
+
+    def test_encoding_matches_orjson(self):
+        # The stdlib fallback must produce the same bytes as orjson
+        data = {"at": datetime(2024, 1, 2, 3, 4, 5), "name": "é", "n": [1, None]}
+        self.assertEqual(
+            json_response(data).body,
+            '{"at":"2024-01-02T03:04:05","name":"é","n":[1,null]}'.encode('utf-8'),
+        )
+
+class TestErrorResponses(unittest.TestCase):
+    def test_not_found_envelope(self):
+        res = not_found_response()
+        self.assertEqual(res.status, 404)
+        self.assertEqual(res.headers['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(res.body), {"error": "Not Found"})
+
+    def test_server_error_envelope(self):
+        details = 'bad "quote" and \\ backslash'
+        res = server_error_response(details)
+        self.assertEqual(res.status, 500)
+        self.assertEqual(
+            json.loads(res.body),
+            {"error": "Internal Server Error", "details": details},
+        )
+        self.assertEqual(
+            res.body,
+            json_response({"error": "Internal Server Error", "details": details}).body,
+        )
+
+class TestFrameworkRequest(unittest.TestCase):
+    def test_json_parsed_once(self):
+        req = FrameworkRequest(method='POST', body=json.dumps({'key': 'value'}))
+        self.assertEqual(req.json(), {'key': 'value'})
+        self.assertIs(req.json(), req.json())
+
+    def test_invalid_or_empty_json(self):
+        self.assertEqual(FrameworkRequest(method='POST', body='invalid').json(), {})
+        self.assertEqual(FrameworkRequest(method='POST', body='').json(), {})
+
+class TestParams(unittest.TestCase):
+    def test_positional_names_without_self(self):
+        self.assertEqual(_params(CommentController.list_for_post), (('id',), True))
+        self.assertEqual(_params(lambda self: None), ((), True))
+        self.assertEqual(_params(lambda self, id, slug=None: None), (('id', 'slug'), True))
+
+class TestCombinedRegex(unittest.TestCase):
+    def setUp(self):
+        self.router = DispatchRouter()
+        self.router.get('/files/<name>.txt', lambda r: "file")
+
+    def test_no_prefix_match(self):
+        req = Request(path='/files/notes.txt.bak')
+        self.assertIsNone(self.router.match(req))
+
+    def test_recompiled_after_registration(self):
+        self.assertIsNotNone(self.router.match(Request(path='/files/a.txt')))
+        self.router.get('/logs/<day>.log', lambda r: "log")
+        req = Request(path='/logs/monday.log')
+        self.assertEqual(self.router.match(req)(req), "log")
+        self.assertEqual(req.path_params, {'day': 'monday'})
+
+class TestRequestBody(unittest.TestCase):
+    def test_bytes_body(self):
+        req = FrameworkRequest(method='POST', body='{"name": "é"}'.encode('utf-8'))
+        self.assertEqual(req.json(), {'name': 'é'})
+
+    def test_invalid_utf8_body(self):
+        req = FrameworkRequest(method='POST', body=b'{"name": "\xff"}')
+        self.assertEqual(req.json(), {})
+
+class QuietHandler(FrameworkHTTPHandler):
+    def log_message(self, format, *args):
+        pass
+
+def roundtrip(raw):
+    """Run one raw HTTP request through the handler over a socketpair."""
+    server, client = socket.socketpair()
+    with client:
+        with server:
+            client.sendall(raw)
+            QuietHandler(server, ('127.0.0.1', 0), None)
+        return client.makefile('rb').read()
+
+class TestHTTPHandler(unittest.TestCase):
+    def setUp(self):
+        User._clear_storage()
+
+    def request(self, raw):
+        head, _, body = roundtrip(raw).partition(b'\r\n\r\n')
+        status, *lines = head.decode('latin-1').split('\r\n')
+        headers = dict(line.split(': ', 1) for line in lines)
+        return status, headers, body
+
+    def test_json_response(self):
+        User.create(name="A", email="a@example.com")
+        status, headers, body = self.request(b'GET /users HTTP/1.1\r\nHost: x\r\n\r\n')
+        self.assertEqual(status, 'HTTP/1.0 200 OK')
+        self.assertEqual(headers['Content-Type'], 'application/json')
+        self.assertEqual(int(headers['Content-Length']), len(body))
+        self.assertIn('Date', headers)
+        self.assertEqual(json.loads(body)[0]['name'], "A")
+
+    def test_not_found(self):
+        status, headers, body = self.request(b'GET /missing HTTP/1.1\r\n\r\n')
+        self.assertEqual(status, 'HTTP/1.0 404 Not Found')
+        self.assertEqual(int(headers['Content-Length']), len(body))
+        self.assertEqual(json.loads(body), {"error": "Not Found"})
+
+    def test_post_body(self):
+        payload = json.dumps({"name": "B", "email": "b@example.com"}).encode('utf-8')
+        status, headers, body = self.request(
+            b'POST /users HTTP/1.1\r\nContent-Length: %d\r\n\r\n' % len(payload) + payload
+        )
+        self.assertEqual(status, 'HTTP/1.0 201 Created')
+        self.assertEqual(int(headers['Content-Length']), len(body))
+        self.assertEqual(json.loads(body)['name'], "B")
+        self.assertEqual(User.count(), 1)
+
+class TestCachedJSON(unittest.TestCase):
+    def setUp(self):
+        Post._clear_storage()
+
+    def test_cache_invalidated_on_save(self):
+        post = Post.create(title="Old", author_id=1)
+        cached = post.to_json_bytes()
+        self.assertIs(post.to_json_bytes(), cached)
+        self.assertEqual(json.loads(cached)['title'], "Old")
+
+        post.title = "New"
+        post.save()
+        self.assertEqual(json.loads(post.to_json_bytes())['title'], "New")
+
+    def test_list_response_is_json_array(self):
+        Post.create(title="A", author_id=1)
+        Post.create(title="B", author_id=1)
+        res = json_list_response(Post.all())
+        self.assertEqual([p['title'] for p in json.loads(res.body)], ["A", "B"])
+        self.assertEqual(json.loads(json_list_response([]).body), [])
+
+class EchoController(PostController):
+    def none(self):
+        return ()
+
+    def one(self, id):
+        return (id,)
+
+    def two(self, id, slug):
+        return (id, slug)
+
+    def optional(self, id=None):
+        return (id,)
+
+class TestSpecializedHandlers(unittest.TestCase):
+    def call(self, method_name, **path_params):
+        req = FrameworkRequest(path='/echo')
+        req.path_params = path_params
+        return register_controller(EchoController, method_name)(req)
+
+    def test_param_shapes(self):
+        self.assertEqual(self.call('none', id='1'), ())
+        self.assertEqual(self.call('one', id='1'), ('1',))
+        self.assertEqual(self.call('two', id='1', slug='s'), ('1', 's'))
+
+    def test_missing_param_uses_default(self):
+        self.assertEqual(self.call('optional'), (None,))
+        self.assertEqual(self.call('optional', id='2'), ('2',))
+
+class TestSegmentRouting(unittest.TestCase):
+    def setUp(self):
+        self.router = DispatchRouter()
+        self.router.get('/posts/<id>/comments/<cid>', lambda r: "comment")
+
+    def test_segment_params(self):
+        req = Request(path='/posts/3/comments/9')
+        self.assertEqual(self.router.match(req)(req), "comment")
+        self.assertEqual(req.path_params, {'id': '3', 'cid': '9'})
+
+    def test_literal_and_length_mismatch(self):
+        for path in ('/posts/3/replies/9', '/posts/3/comments', '/posts/3/comments/9/x'):
+            self.assertIsNone(self.router.match(Request(path=path)), path)
+
+    def test_empty_segment_rejected(self):
+        self.assertIsNone(self.router.match(Request(path='/posts//comments/9')))
+
+class TestPercentiles(unittest.TestCase):
+    def test_empty(self):
+        self.assertEqual(_percentiles([]), {"count": 0})
+
+    def test_microsecond_percentiles(self):
+        samples = [i * 1000 for i in range(100, 0, -1)]
+        self.assertEqual(_percentiles(samples), {
+            "count": 100,
+            "p50_us": 51.0,
+            "p90_us": 91.0,
+            "p99_us": 100.0,
+            "max_us": 100.0,
+        })
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        for samples in _perf.values():
+            samples.clear()
+        self.router = DispatchRouter()
+        self.router.get('/ping', lambda r: json_response({"ok": True}))
+        self.router.get('/__perf__', perf_stats)
+
+    def get(self, path):
+        with mock.patch('app.PROFILE', True), mock.patch('app.router', self.router):
+            return roundtrip(b'GET %s HTTP/1.1\r\n\r\n' % path.encode('ascii'))
+
+    def test_stages_recorded(self):
+        self.get('/ping')
+        self.assertEqual({stage: len(_perf[stage]) for stage in _PERF_STAGES},
+                         {'parse': 1, 'handle': 1, 'write': 1})
+
+    def test_perf_route_not_sampled(self):
+        self.get('/ping')
+        body = self.get('/__perf__').partition(b'\r\n\r\n')[2]
+        self.assertEqual(json.loads(body)['handle']['count'], 1)
+        self.assertEqual(len(_perf['handle']), 1)
+
+class TestLockedModel(unittest.TestCase):
+    def setUp(self):
+        Model._clear_storage()
+
+    def test_models_share_one_lock(self):
+        self.assertIs(User._lock, Post._lock)
+        self.assertIs(User._lock, Comment._lock)
+
+    def test_concurrent_creates(self):
+        def create_many():
+            for _ in range(50):
+                User.create(name="U", email="u@example.com")
+                Post.create(title="P", author_id=1)
+                Comment.create(post_id=1, content="c", author_id=1)
+
+        threads = [threading.Thread(target=create_many) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        for model in (User, Post, Comment):
+            ids = [obj.id for obj in model.all()]
+            self.assertEqual(len(ids), 200)
+            self.assertEqual(len(set(ids)), 200)
+        self.assertEqual(len(Comment.filter(post_id=1)), 200)
+
+class TestDecoratedParams(unittest.TestCase):
+    def test_decorated_and_keyword_only(self):
+        def passthrough(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                return func(*args, **kwargs)
+            return wrapper
+
+        class Decorated(PostController):
+            @passthrough
+            def retrieve(self, id):
+                return id
+
+            def keyword(self, *, id):
+                return id
+
+        self.assertEqual(_params(Decorated.retrieve), (('id',), True))
+        self.assertEqual(_params(Decorated.keyword), (('id',), False))
+        for method_name in ('retrieve', 'keyword'):
+            handler = register_controller(Decorated, method_name)
+            req = FrameworkRequest(path='/posts/3')
+            req.path_params = {'id': '3'}
+            self.assertEqual(handler(req), '3')
+
+class TestRoutePrecedence(unittest.TestCase):
+    def setUp(self):
+        self.router = DispatchRouter()
+
+    def dispatch(self, path):
+        req = Request(path=path)
+        handler = self.router.match(req)
+        return (handler(req) if handler else None), req.path_params
+
+    def test_regex_route_registered_first_wins(self):
+        self.router.get('/a/<x>-<y>', lambda r: "pair")
+        self.router.get('/a/<x>', lambda r: "single")
+        self.assertEqual(self.dispatch('/a/1-2'), ("pair", {'x': '1', 'y': '2'}))
+        self.assertEqual(self.dispatch('/a/1')[0], "single")
+
+    def test_segment_route_registered_first_wins(self):
+        self.router.get('/a/<x>', lambda r: "single")
+        self.router.get('/a/<x>-<y>', lambda r: "pair")
+        self.assertEqual(self.dispatch('/a/1-2'), ("single", {'x': '1-2'}))
+
+    def test_static_route_precedence(self):
+        self.router.get('/u/<id>', lambda r: "dynamic")
+        self.router.get('/u/me', lambda r: "static")
+        self.router.get('/v/me', lambda r: "static")
+        self.router.get('/v/<id>', lambda r: "dynamic")
+        self.assertEqual(self.dispatch('/u/me')[0], "dynamic")
+        self.assertEqual(self.dispatch('/v/me')[0], "static")
+        self.assertEqual(self.dispatch('/v/1')[0], "dynamic")
+
+class TestCreateForPost(unittest.TestCase):
+    def setUp(self):
+        Comment._clear_storage()
+
+    def test_request_body_left_untouched(self):
+        body = json.dumps({"content": "hi", "author_id": 1})
+        req = FrameworkRequest(method='POST', path='/posts/4/comments', body=body)
+        res = CommentController(req).create_for_post('4')
+        self.assertEqual(res.status, 201)
+        self.assertNotIn('post_id', req.json())
+        self.assertEqual(len(Comment.filter(post_id=4)), 1)
+
 if __name__ == '__main__':
     unittest.main()
 